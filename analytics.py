@@ -0,0 +1,142 @@
+# analytics.py
+import os
+import math
+import hashlib
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+# Sketch sizes; memory is fixed by these, not by traffic or user count.
+CMS_WIDTH = int(os.getenv("STATS_CMS_WIDTH", 2048))
+CMS_DEPTH = int(os.getenv("STATS_CMS_DEPTH", 4))
+HLL_PRECISION = int(os.getenv("STATS_HLL_PRECISION", 12))
+TOP_K = int(os.getenv("STATS_TOP_K", 20))
+
+_MASK64 = (1 << 64) - 1
+
+
+def _hash64(key: str) -> int:
+    """Stable 64-bit hash (unlike hash(), identical across restarts)."""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class CountMinSketch:
+    """Approximate per-key counters in `depth` x `width` 32-bit cells; never under-counts."""
+
+    def __init__(self, width: int = CMS_WIDTH, depth: int = CMS_DEPTH):
+        self.width = width
+        self.depth = depth
+        self._rows = [array("I", bytes(4 * width)) for _ in range(depth)]
+
+    def _cells(self, h: int):
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        for i, row in enumerate(self._rows):
+            yield row, (h1 + i * h2) % self.width
+
+    def add(self, h: int, count: int = 1) -> int:
+        """Add to the counters for hash `h` and return the new estimate."""
+        estimate = None
+        for row, idx in self._cells(h):
+            value = min(row[idx] + count, 0xFFFFFFFF)
+            row[idx] = value
+            if estimate is None or value < estimate:
+                estimate = value
+        return estimate
+
+    def estimate(self, h: int) -> int:
+        return min(row[idx] for row, idx in self._cells(h))
+
+
+class HyperLogLog:
+    """Distinct-count estimator using 2**precision one-byte registers."""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.m = 1 << precision
+        self._registers = bytearray(self.m)
+
+    def add(self, h: int):
+        idx = h >> (64 - self.precision)
+        rest = (h << self.precision) & _MASK64
+        rank = 64 - rest.bit_length() + 1 if rest else 64 - self.precision + 1
+        if rank > self._registers[idx]:
+            self._registers[idx] = rank
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self._registers)
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class SpaceSaving:
+    """Top-K heavy hitters with at most `k` tracked keys (Metwally et al.)."""
+
+    def __init__(self, k: int = TOP_K):
+        self.k = k
+        self._counts: Dict[str, int] = {}
+
+    def add(self, key: str, count: int = 1):
+        if key in self._counts:
+            self._counts[key] += count
+        elif len(self._counts) < self.k:
+            self._counts[key] = count
+        else:
+            # Replace the current minimum; k is a small constant so this stays O(1)
+            victim = min(self._counts, key=self._counts.__getitem__)
+            self._counts[key] = self._counts.pop(victim) + count
+
+    def top(self, n: int = None) -> List[Tuple[str, int]]:
+        items = sorted(self._counts.items(), key=lambda kv: kv[1], reverse=True)
+        return items[:n] if n else items
+
+
+class RequestAnalytics:
+    """Fixed-memory usage counters for the request path."""
+
+    def __init__(self):
+        self.requests = 0
+        self.alias_counts = CountMinSketch()
+        self.file_counts = CountMinSketch()
+        self.top_aliases = SpaceSaving()
+        self.top_files = SpaceSaving()
+        # Unique users per UTC day; only today and yesterday are kept
+        self._daily_users: Dict[str, HyperLogLog] = {}
+
+    def record_user(self, user_id: int):
+        day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        hll = self._daily_users.get(day)
+        if hll is None:
+            hll = self._daily_users[day] = HyperLogLog()
+            for old in sorted(self._daily_users)[:-2]:
+                del self._daily_users[old]
+        hll.add(_hash64(str(user_id)))
+
+    def record_request(self):
+        self.requests += 1
+
+    def record_alias(self, alias_name: str):
+        self.record_request()
+        self.alias_counts.add(_hash64(alias_name))
+        self.top_aliases.add(alias_name)
+
+    def record_file(self, file_name: str):
+        self.file_counts.add(_hash64(file_name))
+        self.top_files.add(file_name)
+
+    def alias_estimate(self, alias_name: str) -> int:
+        return self.alias_counts.estimate(_hash64(alias_name))
+
+    def file_estimate(self, file_name: str) -> int:
+        return self.file_counts.estimate(_hash64(file_name))
+
+    def unique_users(self) -> Dict[str, int]:
+        return {day: hll.count() for day, hll in sorted(self._daily_users.items())}
+
+    def hot_aliases(self, n: int = 10) -> List[str]:
+        return [name for name, _ in self.top_aliases.top(n)]
@@ -0,0 +1,126 @@
+# benchmarks/bench_catalog.py
+"""Resident memory and load time of files.json: dict-of-strings vs Catalog.
+
+Each (variant, size) pair runs in a fresh subprocess so numbers don't bleed into
+each other. "retained heap" is what tracemalloc still sees allocated once the raw
+JSON is dropped and "peak heap" the high-water mark while loading; "RSS" is the
+process resident set growth over the same span.
+
+Usage: python benchmarks/bench_catalog.py [sizes...]
+"""
+import gc
+import json
+import os
+import random
+import string
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+# variant -> (load as Catalog?, JSON carries metadata?)
+VARIANTS = {
+    "dict": (False, False),          # what bot.py did before: {name: file_id}
+    "dict+meta": (False, True),      # the naive way to keep metadata: {name: {...}}
+    "catalog": (True, False),
+    "catalog+meta": (True, True),
+}
+
+
+def _rss_kb() -> int:
+    """Current resident set size in KiB (Linux), falling back to peak RSS."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _write_json(path: str, n: int, with_meta: bool):
+    rng = random.Random(n)
+    alphabet = string.ascii_letters + string.digits + "-_"
+    data = {}
+    for i in range(n):
+        name = f"[ASP] Anime Title {i // 24} - Episode {i % 24 + 1:02d} [1080p] [{i}].mkv"
+        file_id = "BAACAgUAAxkBAAI" + "".join(rng.choices(alphabet, k=56))
+        if with_meta:
+            data[name] = {
+                "file_id": file_id,
+                "file_unique_id": "AgAD" + "".join(rng.choices(alphabet, k=12)),
+                "file_size": rng.randint(50_000_000, 1_500_000_000),
+                "duration": rng.randint(1200, 1500),
+                "mime_type": rng.choice(("video/x-matroska", "video/mp4")),
+            }
+        else:
+            data[name] = file_id
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def _load(path: str, as_catalog: bool):
+    from catalog import Catalog
+
+    with open(path, "r", encoding="utf-8") as f:
+        if as_catalog:
+            # What bot.read_catalog() does: no intermediate dict
+            return Catalog.from_json(f.read())
+        return json.load(f)
+
+
+def _child(path: str, as_catalog: bool, traced: bool):
+    import catalog  # noqa: F401  (import cost excluded from the measurement)
+
+    if traced:
+        import tracemalloc
+        tracemalloc.start()
+
+    gc.collect()
+    before = _rss_kb()
+    started = time.perf_counter()
+    loaded = _load(path, as_catalog)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    result = {"load_s": elapsed, "rss_mb": (_rss_kb() - before) / 1024}
+    if traced:
+        current, peak = tracemalloc.get_traced_memory()
+        result["heap_mb"] = current / (1024 * 1024)
+        result["peak_mb"] = peak / (1024 * 1024)
+    print(json.dumps(result))
+    return loaded
+
+
+def _run_child(path: str, as_catalog: bool, traced: bool) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", path, str(int(as_catalog)), str(int(traced))],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or list(DEFAULT_SIZES)
+    print(f"{'entries':>10} {'variant':>14} {'load (s)':>10} {'RSS (MB)':>10} {'retained heap (MB)':>19} {'peak heap (MB)':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            paths = {}
+            for with_meta in (False, True):
+                paths[with_meta] = os.path.join(tmp, f"files_{n}_{int(with_meta)}.json")
+                _write_json(paths[with_meta], n, with_meta)
+
+            for variant, (as_catalog, with_meta) in VARIANTS.items():
+                timed = _run_child(paths[with_meta], as_catalog, traced=False)
+                traced = _run_child(paths[with_meta], as_catalog, traced=True)
+                print(f"{n:>10} {variant:>14} {timed['load_s']:>10.3f} {timed['rss_mb']:>10.1f} "
+                      f"{traced['heap_mb']:>19.1f} {traced['peak_mb']:>15.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        _child(sys.argv[2], sys.argv[3] == "1", sys.argv[4] == "1")
+    else:
+        main()
@@ -14,22 +14,30 @@ from telegram.ext import (
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
+    TypeHandler,
+    ApplicationHandlerStop,
     ContextTypes,
     filters,
 )
 import asyncio
 from aiohttp import web
 from gist_sync import load_all_files, save_json_dict
+from log_pipeline import setup_logging, dropped_records
+from ingress import IngressLimiter, UpdateIdWindow, ALLOWED, COLLAPSED, CALLBACK_COLLAPSE_SECONDS
+from delivery import DeliveryLedger
+from analytics import RequestAnalytics
+from catalog import Catalog, FileRecord
+from http_pools import TrafficPools, INTERACTIVE, DELIVERY, DELETES, ADMIN
 
 
 # =====================
 # Load Environment & Logging
 # =====================
 load_dotenv()
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO
-)
+# JSON logs via a queue + background writer thread, so handlers never block on stdout
+setup_logging()
+# httpx logs every Bot API request at INFO; that's one line per send/delete
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 # =====================
 # Config
@@ -50,6 +58,7 @@ if not TOKEN or not WEBHOOK_URL:
 
 DATA_FILE = "files.json"
 ALIAS_FILE = "aliases.json"
+STATS_FILE = "stats.json"  # Hot aliases snapshot, used to pre-warm caches on startup
 
 
 # Track last activity & sent messages clean up
@@ -57,6 +66,28 @@ ALIAS_FILE = "aliases.json"
 LAST_ACTIVITY = datetime.now(timezone.utc)
 SENT_MESSAGES = []  # Track all messages for cleanup
 
+# Per-user ingress limiter (runs before every handler)
+INGRESS = IngressLimiter()
+UPDATE_IDS = UpdateIdWindow()  # Drops Telegram webhook retries
+
+# Progress of alias batches, so retried / interrupted deliveries resume
+DELIVERIES = DeliveryLedger()
+
+# In-memory catalog of files.json; reloaded (off the event loop) only when the local file changes
+CATALOG = None
+CATALOG_MTIME = None
+CATALOG_LOCK = asyncio.Lock()
+
+# Fixed-memory request analytics (count-min / HyperLogLog / top-K)
+STATS = RequestAnalytics()
+
+# alias name -> [(file name, file_id), ...]; cleared whenever files or aliases are saved
+RESOLVED_ALIASES = {}
+RESOLVED_ALIASES_MAX = 512
+
+# Separate HTTP connection pools per traffic class (interactive / delivery / deletes / admin)
+POOLS = TrafficPools(TOKEN)
+
 
 
 # =====================
@@ -90,6 +121,65 @@ def save_json(path, data):
         ok = save_json_dict(filename, data)
         if not ok:
             logging.warning(f"Failed to save {filename} to gist.")
+    if path in (DATA_FILE, ALIAS_FILE):
+        RESOLVED_ALIASES.clear()
+
+
+def read_catalog():
+    """Parse files.json (local, else gist) straight into a Catalog; blocking."""
+    if os.path.exists(DATA_FILE):
+        with open(DATA_FILE, "r", encoding="utf-8") as f:
+            return Catalog.from_json(f.read())
+    if GIST_ENABLED:
+        content = load_all_files().get(os.path.basename(DATA_FILE))
+        if content:
+            try:
+                return Catalog.from_json(content)
+            except Exception:
+                return Catalog()
+    return Catalog()
+
+
+async def load_catalog():
+    """Return the cached Catalog, rebuilding it only if files.json changed on disk.
+
+    The rebuild runs in a worker thread so a large catalog doesn't stall the loop.
+    """
+    global CATALOG, CATALOG_MTIME
+    mtime = os.path.getmtime(DATA_FILE) if os.path.exists(DATA_FILE) else None
+    if CATALOG is not None and mtime == CATALOG_MTIME:
+        return CATALOG
+    async with CATALOG_LOCK:
+        # Another handler may have rebuilt it while we waited
+        mtime = os.path.getmtime(DATA_FILE) if os.path.exists(DATA_FILE) else None
+        if CATALOG is None or mtime != CATALOG_MTIME:
+            CATALOG = await asyncio.to_thread(read_catalog)
+            CATALOG_MTIME = mtime
+            RESOLVED_ALIASES.clear()
+    return CATALOG
+
+
+def save_catalog(catalog):
+    global CATALOG, CATALOG_MTIME
+    save_json(DATA_FILE, catalog.to_dict())
+    CATALOG = catalog
+    CATALOG_MTIME = os.path.getmtime(DATA_FILE)
+
+
+def resolve_alias(alias_name, catalog, aliases):
+    """Return the (file name, file_id) pairs an alias expands to, cached per alias."""
+    resolved = RESOLVED_ALIASES.get(alias_name)
+    if resolved is None:
+        resolved = [
+            (name, file_id)
+            for fname in aliases[alias_name]
+            for name, file_id in catalog.items()
+            if fname.lower() in name.lower()
+        ]
+        if len(RESOLVED_ALIASES) >= RESOLVED_ALIASES_MAX:
+            RESOLVED_ALIASES.clear()
+        RESOLVED_ALIASES[alias_name] = resolved
+    return resolved
 
 
 def remove_emojis(text):
@@ -115,7 +205,7 @@ async def schedule_delete_message(context: ContextTypes.DEFAULT_TYPE, chat_id: i
     """Schedules deletion of a message after given seconds (default 30 minutes)."""
     try:
         await asyncio.sleep(delay)
-        await context.bot.delete_message(chat_id=chat_id, message_id=msg_id)
+        await POOLS.bot(DELETES).delete_message(chat_id=chat_id, message_id=msg_id)
         try:
             SENT_MESSAGES.remove((chat_id, msg_id))
         except ValueError:
@@ -125,6 +215,36 @@ async def schedule_delete_message(context: ContextTypes.DEFAULT_TYPE, chat_id: i
 
 
 
+# =====================
+# Ingress Limiter
+# =====================
+async def ingress_guard(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Silently drop floods and collapse repeated requests before any handler replies."""
+    user = update.effective_user
+    # Channel posts (vault auto-save) have no user; the admin is never limited
+    if user is None or user.id == ADMIN_ID:
+        return
+    STATS.record_user(user.id)
+
+    key = None
+    collapse_seconds = None
+    if update.message and update.message.text:
+        key = update.message.text
+    elif update.callback_query:
+        key = update.callback_query.data
+        collapse_seconds = CALLBACK_COLLAPSE_SECONDS
+
+    verdict = INGRESS.check(user.id, key, collapse_seconds=collapse_seconds)
+    if verdict != ALLOWED:
+        if update.callback_query:
+            # Stop the button spinner; a toast only, nothing is sent to the chat
+            try:
+                await update.callback_query.answer("Please wait…" if verdict == COLLAPSED else None)
+            except Exception:
+                pass
+        raise ApplicationHandlerStop
+
+
 # =====================
 # Core Commands
 # =====================
@@ -220,33 +340,49 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # =====================
 async def process_alias_or_file(update: Update, context: ContextTypes.DEFAULT_TYPE, alias_name: str):
     update_activity()
-    data = load_json(DATA_FILE) or {}
+    catalog = await load_catalog()
     aliases = load_json(ALIAS_FILE) or {}
     sent_count = 0
 
     # If alias found
     if alias_name in aliases:
-        msg = await update.message.reply_text("📦 Preparing your files... please wait.")
-        SENT_MESSAGES.append((msg.chat_id, msg.message_id))
-        context.application.create_task(schedule_delete_message(context, msg.chat_id, msg.message_id))
-        
-        await asyncio.sleep(1.5)
+        # Only names that exist are counted; callback_data can be forged
+        STATS.record_alias(alias_name)
+        chat_id = update.effective_chat.id
+        files = resolve_alias(alias_name, catalog, aliases)
+
+        start_at = DELIVERIES.begin(chat_id, alias_name, len(files))
+        if start_at is None:
+            # Same batch is already being sent to this chat (retry / double press)
+            return
 
-        for fname in aliases[alias_name]:
-            for name, file_id in data.items():
-                if fname.lower() in name.lower():
-                    video_msg = await context.bot.send_video(chat_id=update.effective_chat.id, video=file_id)
-                    SENT_MESSAGES.append((video_msg.chat_id, video_msg.message_id))
-                    sent_count += 1
+        try:
+            msg = await update.message.reply_text(
+                "📦 Resuming your files... please wait." if start_at else "📦 Preparing your files... please wait."
+            )
+            SENT_MESSAGES.append((msg.chat_id, msg.message_id))
+            context.application.create_task(schedule_delete_message(context, msg.chat_id, msg.message_id))
 
-        if sent_count == 0:
+            await asyncio.sleep(1.5)
+
+            for name, file_id in files[start_at:]:
+                video_msg = await POOLS.bot(DELIVERY).send_video(chat_id=chat_id, video=file_id)
+                SENT_MESSAGES.append((video_msg.chat_id, video_msg.message_id))
+                DELIVERIES.advance(chat_id, alias_name)
+                STATS.record_file(name)
+            sent_count = len(files) - start_at
+            DELIVERIES.finish(chat_id, alias_name)
+        finally:
+            DELIVERIES.release(chat_id, alias_name)
+
+        if not files:
             msg = await update.message.reply_text("❌ No matching files found for this request.")
             SENT_MESSAGES.append((msg.chat_id, msg.message_id))
             context.application.create_task(schedule_delete_message(context, msg.chat_id, msg.message_id))
             
         else:
             msg = await update.message.reply_text(
-                f"✅ Sent {sent_count} files for: <b>{alias_name}</b>\n\n"
+                f"✅ Sent {sent_count} {'remaining ' if start_at else ''}files for: <b>{alias_name}</b>\n\n"
                 "🕒 Files auto-delete in 30 minutes.",
                 parse_mode="HTML"
             )
@@ -256,15 +392,18 @@ async def process_alias_or_file(update: Update, context: ContextTypes.DEFAULT_TY
         return
 
     # If single file found
-    if alias_name in data:
-        file_id = data[alias_name]
+    if alias_name in catalog:
+        # A file name, not an alias: counted as a request, tracked only in the file stats
+        STATS.record_request()
+        file_id = catalog.file_id(alias_name)
         msg = await update.message.reply_text("📦 Fetching your file... please wait.")
         SENT_MESSAGES.append((msg.chat_id, msg.message_id))
         context.application.create_task(schedule_delete_message(context, msg.chat_id, msg.message_id))
         
         try:
-            video_msg = await context.bot.send_video(chat_id=update.effective_chat.id, video=file_id)
+            video_msg = await POOLS.bot(DELIVERY).send_video(chat_id=update.effective_chat.id, video=file_id)
             SENT_MESSAGES.append((video_msg.chat_id, video_msg.message_id))
+            STATS.record_file(alias_name)
         except Exception:
             logging.exception("Failed to send video")
             await update.message.reply_text("❌ Failed to send file.")
@@ -357,7 +496,7 @@ async def handle_refresh(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def delete_message(context: ContextTypes.DEFAULT_TYPE):
     data = context.job.data
     try:
-        await context.bot.delete_message(chat_id=data["chat_id"], message_id=data["msg_id"])
+        await POOLS.bot(DELETES).delete_message(chat_id=data["chat_id"], message_id=data["msg_id"])
         try:
             SENT_MESSAGES.remove((data["chat_id"], data["msg_id"]))
         except ValueError:
@@ -397,19 +536,19 @@ async def add_file(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return await update.message.reply_text("Usage: /add <file name> <file_id>")
     file_name = remove_emojis(" ".join(context.args[:-1]))
     file_id = context.args[-1]
-    data = load_json(DATA_FILE) or {}
-    data[file_name] = file_id
-    save_json(DATA_FILE, data)
+    catalog = await load_catalog()
+    catalog.add(FileRecord(file_name, file_id))
+    save_catalog(catalog)
     await update.message.reply_text(f"✅ Added file:\n<b>{file_name}</b>", parse_mode="HTML")
 
 async def list_files(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await admin_only(update, context):
         return await update.message.reply_text("⛔ Unauthorized.")
-    data = load_json(DATA_FILE) or {}
-    if not data:
+    catalog = await load_catalog()
+    if not len(catalog):
         return await update.message.reply_text("📂 No files saved yet.")
     text = "<b>📜 Saved Files:</b>\n\n"
-    for i, name in enumerate(data.keys(), start=1):
+    for i, name in enumerate(catalog.names(), start=1):
         safe_name = name.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
         text += f"{i}. {safe_name}\n"
     await update.message.reply_text(text, parse_mode="HTML")
@@ -420,10 +559,9 @@ async def remove_file(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
         return await update.message.reply_text("Usage: /remove <file name>")
     key = " ".join(context.args)
-    data = load_json(DATA_FILE) or {}
-    if key in data:
-        del data[key]
-        save_json(DATA_FILE, data)
+    catalog = await load_catalog()
+    if catalog.remove(key):
+        save_catalog(catalog)
         await update.message.reply_text(f"✅ Successfully removed file:\n<b>{key}</b>", parse_mode="HTML")
     else:
         await update.message.reply_text("❌ File not found.")
@@ -431,9 +569,88 @@ async def remove_file(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def clear_all(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await admin_only(update, context):
         return await update.message.reply_text("⛔ Unauthorized.")
-    save_json(DATA_FILE, {})
+    save_catalog(Catalog())
     await update.message.reply_text("⚠ All files cleared!")
 
+async def ingress_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await admin_only(update, context):
+        return await update.message.reply_text("⛔ Unauthorized.")
+    stats = INGRESS.snapshot()
+    stats["duplicate_updates"] = UPDATE_IDS.duplicates
+    stats["stale_updates"] = UPDATE_IDS.stale
+    text = "<b>🚦 Ingress Limiter:</b>\n\n"
+    for name, value in stats.items():
+        text += f"{name}: {value}\n"
+    await update.message.reply_text(text, parse_mode="HTML")
+
+async def pool_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await admin_only(update, context):
+        return await update.message.reply_text("⛔ Unauthorized.")
+    text = "<b>🔌 Connection Pools:</b>\n\n"
+    for traffic_class, stats in POOLS.snapshot().items():
+        text += f"<b>{traffic_class}</b>: " + ", ".join(f"{k}={v}" for k, v in stats.items()) + "\n"
+    await update.message.reply_text(text, parse_mode="HTML")
+
+async def show_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await admin_only(update, context):
+        return await update.message.reply_text("⛔ Unauthorized.")
+
+    def esc(value):
+        return str(value).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+    text = "<b>📊 Usage Stats:</b>\n\n"
+    text += f"Requests: {STATS.requests}\n"
+    for day, count in STATS.unique_users().items():
+        text += f"Unique users {day}: ~{count}\n"
+
+    text += "\n<b>🔥 Top aliases:</b>\n"
+    for i, (name, _) in enumerate(STATS.top_aliases.top(10), start=1):
+        text += f"{i}. {esc(name)} (~{STATS.alias_estimate(name)})\n"
+
+    text += "\n<b>🎞 Top files:</b>\n"
+    for i, (name, _) in enumerate(STATS.top_files.top(10), start=1):
+        text += f"{i}. {esc(name)} (~{STATS.file_estimate(name)})\n"
+
+    ingress = INGRESS.snapshot()
+    log_dropped = dropped_records() or {}
+    by_level = ", ".join(f"{level} {count}" for level, count in sorted(log_dropped.items()))
+    text += (
+        f"\n🚦 Ingress: allowed {ingress['allowed']}, dropped {ingress['dropped']}, "
+        f"collapsed {ingress['collapsed']}, duplicates {UPDATE_IDS.duplicates}\n"
+        f"📝 Log records dropped: {sum(log_dropped.values())}"
+        f"{f' ({by_level})' if by_level else ''}\n"
+    )
+    await update.message.reply_text(text, parse_mode="HTML")
+
+async def persist_hot_aliases(state: dict):
+    """Save the hottest aliases so the next start can pre-warm them (skipped if unchanged)."""
+    hot = STATS.hot_aliases()
+    if not hot or hot == state.get("last"):
+        return
+    state["last"] = hot
+    try:
+        await asyncio.to_thread(save_json, STATS_FILE, {"hot_aliases": hot})
+    except Exception:
+        logging.exception("Failed to save hot aliases")
+
+async def save_hot_aliases(context: ContextTypes.DEFAULT_TYPE):
+    """job_queue wrapper around persist_hot_aliases."""
+    await persist_hot_aliases(context.job.data)
+
+async def prewarm_resolution_cache():
+    """Resolve the aliases that were hottest last run before the first request hits them."""
+    hot = (load_json(STATS_FILE) or {}).get("hot_aliases", [])
+    if not hot:
+        return 0
+    catalog = await load_catalog()
+    aliases = load_json(ALIAS_FILE) or {}
+    warmed = 0
+    for alias_name in hot:
+        if alias_name in aliases:
+            resolve_alias(alias_name, catalog, aliases)
+            warmed += 1
+    return warmed
+
 # =====================
 # Alias System (Improved)
 # =====================
@@ -503,9 +720,13 @@ async def get_alias(update: Update, context: ContextTypes.DEFAULT_TYPE):
     safe_alias = alias_name.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
     safe_items = [str(it).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;") for it in items]
     
+    # Match counts and sizes come from catalog metadata, no API calls needed
+    catalog = await load_catalog()
     text = f"<b>Alias name:</b> {safe_alias}\n\n"
-    for i, item in enumerate(safe_items, start=1):
-        text += f"{i}. {item}\n"
+    for i, (item, safe_item) in enumerate(zip(items, safe_items), start=1):
+        matches = catalog.match(str(item))
+        size_mb = sum(r.file_size for r in matches) / (1024 * 1024)
+        text += f"{i}. {safe_item} ({len(matches)} files, {size_mb:.0f} MB)\n"
     
     await update.message.reply_text(text, parse_mode="HTML")
 
@@ -545,14 +766,15 @@ async def save_new_file(update: Update, context: ContextTypes.DEFAULT_TYPE):
     clean_name = remove_emojis(raw_name)
     file_id = file_obj.file_id
 
-    data = load_json(DATA_FILE)
-    if clean_name not in data:
-        data[clean_name] = file_id
-        save_json(DATA_FILE, data)
-        await context.bot.send_message(chat_id=ADMIN_ID, text=f"✅ Auto-saved: {clean_name}")
-        print(f"[SAVED] {clean_name} -> {file_id}")
+    catalog = await load_catalog()
+    if clean_name not in catalog:
+        # Keep file_unique_id / size / duration / mime type so aliases can be filtered without API calls
+        catalog.add(FileRecord.from_file(clean_name, file_obj))
+        save_catalog(catalog)
+        await POOLS.bot(ADMIN).send_message(chat_id=ADMIN_ID, text=f"✅ Auto-saved: {clean_name}")
+        logging.info("[SAVED] %s -> %s", clean_name, file_id)
     else:
-        print(f"[SKIPPED] {clean_name} already exists")
+        logging.info("[SKIPPED] %s already exists", clean_name)
         
 # =====================
 # Fallback: random/unrecognized text handler
@@ -586,7 +808,10 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
 # =====================
 
 async def main():
-    app = Application.builder().token(TOKEN).build()
+    app = Application.builder().token(TOKEN).request(POOLS.request(INTERACTIVE)).build()
+
+    # Ingress limiter runs in its own group before every other handler
+    app.add_handler(TypeHandler(Update, ingress_guard), group=-1)
 
     # -------------------
     # Register all Commands
@@ -601,6 +826,9 @@ async def main():
     app.add_handler(CommandHandler("listaliases", list_aliases))
     app.add_handler(CommandHandler("removealias", remove_alias))
     app.add_handler(CommandHandler("getalias", get_alias))
+    app.add_handler(CommandHandler("ingress", ingress_stats))
+    app.add_handler(CommandHandler("pools", pool_stats))
+    app.add_handler(CommandHandler("stats", show_stats))
    
 
     # Handle random text messages (non-command)
@@ -626,6 +854,9 @@ async def main():
             BotCommand("listaliases", "List aliases"),
             BotCommand("getalias", "View details of an alias"),
             BotCommand("removealias", "Remove alias"),
+            BotCommand("ingress", "Ingress limiter counters"),
+            BotCommand("pools", "Connection pool wait times"),
+            BotCommand("stats", "Usage statistics"),
             BotCommand("clearall", "☠ Clear Database ☠, Don't Use"),
         ]
         try:
@@ -644,8 +875,15 @@ async def main():
     async def handle_webhook(request):
         try:
             data = await request.json()
-            logging.debug("Incoming webhook: %s", data)
+            update_id = data.get("update_id")
+            if update_id is not None and UPDATE_IDS.is_duplicate(update_id):
+                # Telegram retry of an update we already queued
+                return web.Response(text="OK")
+            logging.debug("Incoming webhook update %s", update_id)
             await app.update_queue.put(Update.de_json(data, app.bot))
+            # Only remember the id once queued, so a failed attempt can still be retried
+            if update_id is not None:
+                UPDATE_IDS.add(update_id)
             return web.Response(text="OK")
         except Exception:
             logging.exception("Failed to handle webhook")
@@ -667,12 +905,22 @@ async def main():
         await asyncio.sleep(1.5)
         webhook_url = f"{WEBHOOK_URL.rstrip('/')}/webhook/{TOKEN}"
         await app.bot.set_webhook(webhook_url)
-        print(f"✅ Webhook set successfully at: {webhook_url}")
+        logging.info("✅ Webhook set successfully at: %s", webhook_url)
 
         # Initialize and start Telegram bot
         await app.initialize()
         await app.start()
-        print("🌀 Telegram bot started (webhook mode)")
+        await POOLS.initialize()
+
+        # Pre-warm alias resolution for last run's hottest aliases, then keep the list fresh
+        try:
+            warmed = await prewarm_resolution_cache()
+            logging.info("Pre-warmed %d hot aliases", warmed)
+        except Exception:
+            logging.exception("Failed to pre-warm alias cache")
+        hot_alias_state = {}
+        app.job_queue.run_repeating(save_hot_aliases, interval=timedelta(minutes=30), data=hot_alias_state)
+        logging.info("🌀 Telegram bot started (webhook mode)")
 
         # Start aiohttp web server
         runner = web.AppRunner(web_app)
@@ -681,17 +929,21 @@ async def main():
         site = web.TCPSite(runner, "0.0.0.0", port)
         await site.start()
 
-        print(f"🚀 Bot running via webhook on port {port}")
+        logging.info("🚀 Bot running via webhook on port %d", port)
 
         try:
             await asyncio.Event().wait()
         except asyncio.CancelledError:
-            print("🛑 Shutdown signal received — closing bot gracefully...")
+            logging.info("🛑 Shutdown signal received — closing bot gracefully...")
         finally:
             await app.stop()
             await app.shutdown()
+            # Persist hot aliases on every shutdown, not just every 30 minutes
+            await persist_hot_aliases(hot_alias_state)
+            # Last: app.stop() still drains updates, jobs and tasks that send via these pools
+            await POOLS.shutdown()
             await app.update_queue.join()
-            print("✅ Bot shutdown complete (graceful exit)")
+            logging.info("✅ Bot shutdown complete (graceful exit)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,289 @@
+# catalog.py
+import re
+import sys
+import json
+from json.decoder import scanstring
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+# files.json values are either a bare file_id (legacy) or a dict with these metadata keys
+META_FIELDS = ("file_unique_id", "file_size", "duration", "mime_type")
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+class FileRecord:
+    """One catalog entry. 0 / "" mean the metadata is unknown (e.g. legacy entries)."""
+
+    __slots__ = ("name", "file_id", "file_unique_id", "file_size", "duration", "mime_type")
+
+    def __init__(self, name: str, file_id: str, file_unique_id: str = "", file_size: int = 0,
+                 duration: int = 0, mime_type: str = ""):
+        self.name = name
+        self.file_id = file_id
+        self.file_unique_id = file_unique_id or ""
+        self.file_size = file_size or 0
+        self.duration = duration or 0
+        self.mime_type = mime_type or ""
+
+    @classmethod
+    def from_file(cls, name: str, file_obj) -> "FileRecord":
+        """Build a record from a telegram Video / Document / Animation."""
+        return cls(
+            name,
+            file_obj.file_id,
+            getattr(file_obj, "file_unique_id", None),
+            getattr(file_obj, "file_size", None),
+            getattr(file_obj, "duration", None),
+            getattr(file_obj, "mime_type", None),
+        )
+
+    def to_json(self) -> Union[str, Dict]:
+        if not (self.file_unique_id or self.file_size or self.duration or self.mime_type):
+            return self.file_id
+        value = {"file_id": self.file_id}
+        for field in META_FIELDS:
+            if getattr(self, field):
+                value[field] = getattr(self, field)
+        return value
+
+
+class Catalog:
+    """files.json held as array-backed columns instead of a dict of str objects.
+
+    Names, file_ids and file_unique_ids are packed into one UTF-8 blob each with an
+    array of end offsets; sizes, durations and mime types (interned, stored as a
+    small index) are typed arrays. Name lookup goes through an open-addressing
+    table of row numbers, so no per-entry Python object is kept at all.
+
+    Removing or replacing an entry only tombstones its row (a replaced entry moves
+    to the end); the columns are compacted once enough dead rows pile up.
+    """
+
+    # Compact once dead rows exceed this many and a quarter of all rows
+    COMPACT_MIN_DEAD = 1024
+
+    def __init__(self):
+        self._names = bytearray()
+        self._name_ends = array("I")
+        self._file_ids = bytearray()
+        self._file_id_ends = array("I")
+        self._unique_ids = bytearray()
+        self._unique_id_ends = array("I")
+        self._sizes = array("q")
+        self._durations = array("I")
+        self._mime_idx = array("H")
+        self._mimes: List[str] = [""]
+        self._dead = bytearray()  # 1 per removed / replaced row
+        self._dead_count = 0
+        # Slot holds row + 1, 0 = empty, -1 = removed; size is a power of two kept at >= 2x rows
+        self._table = array("i", bytes(4 * 8))
+
+    @staticmethod
+    def _from_value(name: str, value: Union[str, Dict]) -> FileRecord:
+        if isinstance(value, dict):
+            return FileRecord(name, value.get("file_id", ""), *(value.get(f) for f in META_FIELDS))
+        return FileRecord(name, value)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Catalog":
+        catalog = cls()
+        for name, value in data.items():
+            catalog.add(cls._from_value(name, value))
+        return catalog
+
+    @classmethod
+    def from_json(cls, text: str) -> "Catalog":
+        """Build straight from files.json text, one entry at a time.
+
+        json.loads() would first materialise the whole dict (a str per name and
+        file_id, a dict per metadata entry) only to copy it into the columns; here
+        each entry is decoded and appended on its own, so peak memory stays at the
+        text plus the columns.
+        """
+        catalog = cls()
+        end = len(text)
+        idx = _WHITESPACE.match(text, 0).end()
+        if idx == end:
+            return catalog
+        if text[idx] != "{":
+            raise json.JSONDecodeError("Expecting '{'", text, idx)
+        idx = _WHITESPACE.match(text, idx + 1).end()
+        if idx < end and text[idx] == "}":
+            return catalog
+
+        while True:
+            if idx >= end or text[idx] != '"':
+                raise json.JSONDecodeError("Expecting property name enclosed in double quotes", text, idx)
+            name, idx = scanstring(text, idx + 1)
+            idx = _WHITESPACE.match(text, idx).end()
+            if idx >= end or text[idx] != ":":
+                raise json.JSONDecodeError("Expecting ':' delimiter", text, idx)
+            idx = _WHITESPACE.match(text, idx + 1).end()
+            value, idx = _DECODER.raw_decode(text, idx)
+            catalog.add(cls._from_value(name, value))
+
+            idx = _WHITESPACE.match(text, idx).end()
+            if idx < end and text[idx] == "}":
+                break
+            if idx >= end or text[idx] != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", text, idx)
+            idx = _WHITESPACE.match(text, idx + 1).end()
+
+        if _WHITESPACE.match(text, idx + 1).end() != end:
+            raise json.JSONDecodeError("Extra data", text, idx + 1)
+        return catalog
+
+    def to_dict(self) -> Dict:
+        return {record.name: record.to_json() for record in self.records()}
+
+    # ---- column helpers ----
+    @staticmethod
+    def _cell(blob: bytearray, ends: array, row: int) -> str:
+        start = ends[row - 1] if row else 0
+        return blob[start:ends[row]].decode("utf-8")
+
+    @staticmethod
+    def _append(blob: bytearray, ends: array, value: str):
+        blob += value.encode("utf-8")
+        ends.append(len(blob))
+
+    @staticmethod
+    def _copy_cell(src: bytearray, src_ends: array, row: int, dst: bytearray, dst_ends: array):
+        start = src_ends[row - 1] if row else 0
+        dst += src[start:src_ends[row]]
+        dst_ends.append(len(dst))
+
+    def _live_rows(self) -> Iterator[int]:
+        dead = self._dead
+        return (row for row in range(len(dead)) if not dead[row])
+
+    def _find(self, name: str) -> Tuple[int, int]:
+        """Return (slot, row) for `name`; row is -1 and slot is empty if absent."""
+        table = self._table
+        mask = len(table) - 1
+        key = name.encode("utf-8")
+        slot = hash(name) & mask
+        while table[slot]:
+            if table[slot] > 0:
+                row = table[slot] - 1
+                start = self._name_ends[row - 1] if row else 0
+                if self._names[start:self._name_ends[row]] == key:
+                    return slot, row
+            slot = (slot + 1) & mask
+        return slot, -1
+
+    def _rehash(self, size: int):
+        self._table = array("i", bytes(4 * size))
+        mask = size - 1
+        for row in self._live_rows():
+            slot = hash(self._cell(self._names, self._name_ends, row)) & mask
+            while self._table[slot]:
+                slot = (slot + 1) & mask
+            self._table[slot] = row + 1
+
+    def _compact(self):
+        """Drop tombstoned rows by copying live cells into fresh columns."""
+        fresh = Catalog()
+        fresh._mimes = self._mimes
+        for row in self._live_rows():
+            self._copy_cell(self._names, self._name_ends, row, fresh._names, fresh._name_ends)
+            self._copy_cell(self._file_ids, self._file_id_ends, row, fresh._file_ids, fresh._file_id_ends)
+            self._copy_cell(self._unique_ids, self._unique_id_ends, row, fresh._unique_ids, fresh._unique_id_ends)
+            fresh._sizes.append(self._sizes[row])
+            fresh._durations.append(self._durations[row])
+            fresh._mime_idx.append(self._mime_idx[row])
+            fresh._dead.append(0)
+        size = 8
+        while size < 2 * len(fresh._dead):
+            size *= 2
+        fresh._rehash(size)
+        self.__dict__.update(vars(fresh))
+
+    def _mime_index(self, mime_type: str) -> int:
+        try:
+            return self._mimes.index(mime_type)
+        except ValueError:
+            self._mimes.append(sys.intern(mime_type))
+            return len(self._mimes) - 1
+
+    def _kill(self, slot: int, row: int):
+        self._table[slot] = -1
+        self._dead[row] = 1
+        self._dead_count += 1
+
+    def _maybe_compact(self):
+        if self._dead_count > self.COMPACT_MIN_DEAD and self._dead_count * 4 > len(self._dead):
+            self._compact()
+
+    # ---- public API ----
+    def add(self, record: FileRecord):
+        """Insert a record, replacing any existing entry with the same name."""
+        slot, row = self._find(record.name)
+        if row >= 0:
+            self._kill(slot, row)
+            slot, _ = self._find(record.name)
+
+        self._table[slot] = len(self._dead) + 1
+        self._append(self._names, self._name_ends, record.name)
+        self._append(self._file_ids, self._file_id_ends, record.file_id)
+        self._append(self._unique_ids, self._unique_id_ends, record.file_unique_id)
+        self._sizes.append(record.file_size)
+        self._durations.append(record.duration)
+        self._mime_idx.append(self._mime_index(record.mime_type))
+        self._dead.append(0)
+        if len(self._dead) * 2 > len(self._table):
+            self._rehash(len(self._table) * 2)
+        self._maybe_compact()
+
+    def remove(self, name: str) -> bool:
+        slot, row = self._find(name)
+        if row < 0:
+            return False
+        self._kill(slot, row)
+        self._maybe_compact()
+        return True
+
+    def __len__(self) -> int:
+        return len(self._dead) - self._dead_count
+
+    def __contains__(self, name: str) -> bool:
+        return self._find(name)[1] >= 0
+
+    def file_id(self, name: str) -> Optional[str]:
+        row = self._find(name)[1]
+        return None if row < 0 else self._cell(self._file_ids, self._file_id_ends, row)
+
+    def _record(self, row: int) -> FileRecord:
+        return FileRecord(
+            self._cell(self._names, self._name_ends, row),
+            self._cell(self._file_ids, self._file_id_ends, row),
+            self._cell(self._unique_ids, self._unique_id_ends, row),
+            self._sizes[row],
+            self._durations[row],
+            self._mimes[self._mime_idx[row]],
+        )
+
+    def get(self, name: str) -> Optional[FileRecord]:
+        row = self._find(name)[1]
+        return None if row < 0 else self._record(row)
+
+    def records(self) -> List[FileRecord]:
+        return [self._record(row) for row in self._live_rows()]
+
+    def names(self) -> List[str]:
+        return [self._cell(self._names, self._name_ends, row) for row in self._live_rows()]
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        """(name, file_id) pairs in insertion order, like the old dict."""
+        for row in self._live_rows():
+            yield self._cell(self._names, self._name_ends, row), self._cell(self._file_ids, self._file_id_ends, row)
+
+    def match(self, pattern: str) -> List[FileRecord]:
+        """Records whose name contains `pattern` (case-insensitive)."""
+        pattern = pattern.lower()
+        return [
+            self._record(row) for row in self._live_rows()
+            if pattern in self._cell(self._names, self._name_ends, row).lower()
+        ]
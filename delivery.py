@@ -0,0 +1,66 @@
+# delivery.py
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Progress older than this is discarded (sent files auto-delete after 30 minutes anyway).
+LEDGER_TTL = float(os.getenv("DELIVERY_LEDGER_TTL", 1800))
+LEDGER_MAX_ENTRIES = int(os.getenv("DELIVERY_LEDGER_MAX_ENTRIES", 5000))
+
+
+class _Delivery:
+    __slots__ = ("sent", "total", "stamp", "active")
+
+    def __init__(self, total: int, stamp: float):
+        self.sent = 0
+        self.total = total
+        self.stamp = stamp
+        self.active = True
+
+
+class DeliveryLedger:
+    """Tracks how far each (chat, alias) batch got so an interrupted or retried
+    delivery resumes from the next unsent file instead of starting over."""
+
+    def __init__(self, ttl: float = LEDGER_TTL, max_entries: int = LEDGER_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, str], _Delivery]" = OrderedDict()
+
+    def begin(self, chat_id: int, alias_name: str, total: int) -> Optional[int]:
+        """Return the index to start sending from, or None if the same batch is already in flight."""
+        key = (chat_id, alias_name)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+
+        if entry is not None and now - entry.stamp < self.ttl and entry.total == total:
+            if entry.active:
+                return None
+            entry.active = True
+            entry.stamp = now
+            self._entries.move_to_end(key)
+            return entry.sent
+
+        self._entries[key] = _Delivery(total, now)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return 0
+
+    def advance(self, chat_id: int, alias_name: str):
+        """Mark one more file of the batch as sent."""
+        entry = self._entries.get((chat_id, alias_name))
+        if entry is not None:
+            entry.sent += 1
+            entry.stamp = time.monotonic()
+
+    def finish(self, chat_id: int, alias_name: str):
+        """Forget a completed batch so the next request sends it again from the start."""
+        self._entries.pop((chat_id, alias_name), None)
+
+    def release(self, chat_id: int, alias_name: str):
+        """Keep progress of an interrupted batch but allow it to be resumed."""
+        entry = self._entries.get((chat_id, alias_name))
+        if entry is not None:
+            entry.active = False
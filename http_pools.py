@@ -0,0 +1,184 @@
+# http_pools.py
+import os
+import time
+import asyncio
+from typing import Dict, Optional
+
+from telegram import Bot
+from telegram.error import TimedOut
+from telegram.request import HTTPXRequest
+from telegram._utils.defaultvalue import DefaultValue
+
+# Traffic classes, each with its own HTTP connection pool
+INTERACTIVE = "interactive"  # replies, edits, membership checks a user is waiting on
+DELIVERY = "delivery"        # send_video for alias / file requests
+DELETES = "deletes"          # background auto-delete of sent messages
+ADMIN = "admin"              # notifications to the admin
+
+TRAFFIC_CLASSES = (INTERACTIVE, DELIVERY, DELETES, ADMIN)
+
+# Defaults per class; every value can be overridden with POOL_<CLASS>_<KEY>, e.g. POOL_DELETES_SIZE=4
+POOL_DEFAULTS = {
+    INTERACTIVE: {"size": 8, "pool_timeout": 5.0, "connect_timeout": 5.0, "read_timeout": 10.0, "write_timeout": 10.0},
+    DELIVERY: {"size": 4, "pool_timeout": 20.0, "connect_timeout": 5.0, "read_timeout": 30.0, "write_timeout": 30.0},
+    DELETES: {"size": 2, "pool_timeout": 60.0, "connect_timeout": 5.0, "read_timeout": 10.0, "write_timeout": 10.0},
+    ADMIN: {"size": 1, "pool_timeout": 30.0, "connect_timeout": 5.0, "read_timeout": 10.0, "write_timeout": 10.0},
+}
+
+
+def _pool_config(traffic_class: str) -> Dict[str, float]:
+    """Return the defaults for a class with any environment overrides applied."""
+    config = {}
+    for key, default in POOL_DEFAULTS[traffic_class].items():
+        value = os.getenv(f"POOL_{traffic_class.upper()}_{key.upper()}")
+        config[key] = type(default)(value) if value else default
+    return config
+
+
+class PoolStats:
+    """Request count and time spent waiting for a free connection."""
+
+    __slots__ = ("requests", "waited", "wait_total", "wait_max", "timeouts")
+
+    def __init__(self):
+        self.requests = 0
+        self.waited = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def record(self, wait: float):
+        self.requests += 1
+        if wait > 0.001:
+            self.waited += 1
+        self.wait_total += wait
+        if wait > self.wait_max:
+            self.wait_max = wait
+
+    def as_dict(self) -> Dict[str, float]:
+        avg = self.wait_total / self.requests if self.requests else 0.0
+        return {
+            "requests": self.requests,
+            "waited": self.waited,
+            "avg_wait_ms": round(avg * 1000, 1),
+            "max_wait_ms": round(self.wait_max * 1000, 1),
+            "timeouts": self.timeouts,
+        }
+
+
+class _PriorityGate:
+    """Lets lower-priority classes through only while the interactive pool has room."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.active = 0
+        self._open = asyncio.Event()
+        self._open.set()
+
+    def enter(self):
+        self.active += 1
+        if self.active >= self.capacity:
+            self._open.clear()
+
+    def leave(self):
+        self.active -= 1
+        if self.active < self.capacity:
+            self._open.set()
+
+    async def wait(self):
+        await self._open.wait()
+
+
+class PooledRequest(HTTPXRequest):
+    """HTTPXRequest that owns its pool slots so waits can be timed and prioritised."""
+
+    __slots__ = ("traffic_class", "stats", "_slots", "_gate", "_pool_timeout")
+
+    def __init__(self, traffic_class: str, gate: _PriorityGate, connection_pool_size: int,
+                 pool_timeout: float, **kwargs):
+        super().__init__(connection_pool_size=connection_pool_size, pool_timeout=pool_timeout, **kwargs)
+        self.traffic_class = traffic_class
+        self.stats = PoolStats()
+        self._slots = asyncio.Semaphore(connection_pool_size)
+        self._gate = gate
+        self._pool_timeout = pool_timeout
+
+    async def _acquire(self, interactive: bool):
+        if not interactive:
+            # Background classes yield to interactive traffic while its pool is saturated
+            await self._gate.wait()
+        await self._slots.acquire()
+
+    async def do_request(self, *args, **kwargs):
+        # Like HTTPXRequest: only an unset (DefaultValue) timeout falls back to ours; None = wait forever
+        timeout = kwargs.get("pool_timeout", self._pool_timeout)
+        if isinstance(timeout, DefaultValue):
+            timeout = self._pool_timeout
+
+        interactive = self.traffic_class == INTERACTIVE
+        started = time.monotonic()
+        if interactive:
+            self._gate.enter()
+        try:
+            try:
+                # Gate wait and slot acquire share one pool_timeout deadline
+                await asyncio.wait_for(self._acquire(interactive), timeout)
+            except asyncio.TimeoutError:
+                self.stats.timeouts += 1
+                raise TimedOut(f"Pool timeout: no free {self.traffic_class} connection")
+            try:
+                self.stats.record(time.monotonic() - started)
+                return await super().do_request(*args, **kwargs)
+            finally:
+                self._slots.release()
+        finally:
+            if interactive:
+                self._gate.leave()
+
+
+class TrafficPools:
+    """One request object per traffic class, plus a Bot bound to each non-interactive pool.
+
+    The interactive request is handed to Application.builder(), so `context.bot` and
+    every `reply_text` keep using it; the other classes are reached via `bot(cls)`.
+    """
+
+    def __init__(self, token: str):
+        interactive_size = int(_pool_config(INTERACTIVE)["size"])
+        self._gate = _PriorityGate(interactive_size)
+        self._requests: Dict[str, PooledRequest] = {}
+        self._bots: Dict[str, Bot] = {}
+        for traffic_class in TRAFFIC_CLASSES:
+            config = _pool_config(traffic_class)
+            self._requests[traffic_class] = PooledRequest(
+                traffic_class,
+                self._gate,
+                connection_pool_size=int(config["size"]),
+                pool_timeout=config["pool_timeout"],
+                connect_timeout=config["connect_timeout"],
+                read_timeout=config["read_timeout"],
+                write_timeout=config["write_timeout"],
+            )
+            if traffic_class != INTERACTIVE:
+                # Reuse the class request for get_updates too (unused in webhook mode) so no
+                # extra default HTTP client is built per Bot
+                request = self._requests[traffic_class]
+                self._bots[traffic_class] = Bot(token, request=request, get_updates_request=request)
+
+    def request(self, traffic_class: str) -> PooledRequest:
+        return self._requests[traffic_class]
+
+    def bot(self, traffic_class: str) -> Optional[Bot]:
+        return self._bots.get(traffic_class)
+
+    async def initialize(self):
+        # Only the HTTP clients; Bot.initialize() would also spend a getMe call per Bot
+        for traffic_class in self._bots:
+            await self._requests[traffic_class].initialize()
+
+    async def shutdown(self):
+        for traffic_class in self._bots:
+            await self._requests[traffic_class].shutdown()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {name: req.stats.as_dict() for name, req in self._requests.items()}
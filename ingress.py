@@ -0,0 +1,182 @@
+# ingress.py
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Refill rate and burst size of each user's bucket, plus how many users we track at once.
+RATE_PER_MINUTE = float(os.getenv("INGRESS_RATE_PER_MINUTE", 6))
+BURST = float(os.getenv("INGRESS_BURST", 4))
+MAX_USERS = int(os.getenv("INGRESS_MAX_USERS", 10000))
+# Identical text / button presses from one user inside this window are collapsed into one.
+COLLAPSE_SECONDS = float(os.getenv("INGRESS_COLLAPSE_SECONDS", 10))
+# Button presses get a much shorter window: pressing Refresh again after joining is legitimate.
+CALLBACK_COLLAPSE_SECONDS = float(os.getenv("INGRESS_CALLBACK_COLLAPSE_SECONDS", 2))
+
+# Verdicts returned by IngressLimiter.check()
+ALLOWED = "allowed"
+DROPPED = "dropped"
+COLLAPSED = "collapsed"
+
+
+class _Bucket:
+    """Per-user state; slots keep each entry to a few machine words."""
+
+    __slots__ = ("tokens", "stamp", "last_key", "last_seen")
+
+    def __init__(self, tokens: float, stamp: float):
+        self.tokens = tokens
+        self.stamp = stamp
+        self.last_key = 0
+        self.last_seen = 0.0
+
+
+class IngressLimiter:
+    """Token bucket per user, kept in an LRU table of at most `max_users` entries.
+
+    A user evicted from the table simply starts again with a full bucket, so a flood
+    of unique senders costs bounded memory and never blocks legitimate users.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float = RATE_PER_MINUTE,
+        burst: float = BURST,
+        max_users: int = MAX_USERS,
+        collapse_seconds: float = COLLAPSE_SECONDS,
+    ):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_users = max_users
+        self.collapse_seconds = collapse_seconds
+        self._buckets: "OrderedDict[int, _Bucket]" = OrderedDict()
+        self.counters: Dict[str, int] = {"allowed": 0, "dropped": 0, "collapsed": 0, "evicted": 0}
+
+    def check(self, user_id: int, key: Optional[str] = None, now: Optional[float] = None,
+              collapse_seconds: Optional[float] = None) -> str:
+        """Return ALLOWED if the update should be handled, otherwise DROPPED or COLLAPSED.
+
+        `collapse_seconds` overrides the repeat window for this call (e.g. for callbacks).
+        """
+        if now is None:
+            now = time.monotonic()
+        if collapse_seconds is None:
+            collapse_seconds = self.collapse_seconds
+
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = _Bucket(self.burst, now)
+            self._buckets[user_id] = bucket
+            if len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+                self.counters["evicted"] += 1
+        else:
+            self._buckets.move_to_end(user_id)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.stamp) * self.rate)
+            bucket.stamp = now
+
+        # Collapse exact repeats (same text / same button) of the last allowed request
+        key_hash = hash(key) if key is not None else 0
+        if key is not None and key_hash == bucket.last_key and now - bucket.last_seen < collapse_seconds:
+            self.counters["collapsed"] += 1
+            return COLLAPSED
+
+        if bucket.tokens < 1.0:
+            self.counters["dropped"] += 1
+            return DROPPED
+
+        bucket.tokens -= 1.0
+        if key is not None:
+            bucket.last_key = key_hash
+            bucket.last_seen = now
+        self.counters["allowed"] += 1
+        return ALLOWED
+
+    def snapshot(self) -> Dict[str, int]:
+        """Return a copy of the counters plus the current table size."""
+        stats = dict(self.counters)
+        stats["tracked_users"] = len(self._buckets)
+        return stats
+
+
+# How many recent update_ids to remember for webhook retry dedupe (one bit each).
+UPDATE_ID_WINDOW = int(os.getenv("INGRESS_UPDATE_ID_WINDOW", 8192))
+# A lower id counts as Telegram's random restart (not a late retry) only if it is this far
+# below the newest id, or arrives after this much idle time (Telegram resets after a week).
+UPDATE_ID_RESET_DISTANCE = int(os.getenv("INGRESS_UPDATE_ID_RESET_DISTANCE", 1_000_000))
+UPDATE_ID_RESET_IDLE = float(os.getenv("INGRESS_UPDATE_ID_RESET_IDLE", 24 * 3600))
+
+
+class UpdateIdWindow:
+    """Sliding bitmap over the most recent update_ids.
+
+    Telegram hands out update_ids in increasing order and retries a webhook
+    delivery with the same id, so a window of N bits (N/8 bytes) is enough to
+    recognise retries. After a week without updates Telegram restarts from a
+    random id; an id far below the window (or after a long idle gap) resets the
+    window to it. Any other id below the window is a late retry we can no longer
+    tell apart: it is counted as stale and leaves the window untouched.
+    """
+
+    __slots__ = ("size", "reset_distance", "reset_idle", "_bits", "_high", "_last_add", "duplicates", "stale")
+
+    def __init__(self, size: int = UPDATE_ID_WINDOW, reset_distance: int = UPDATE_ID_RESET_DISTANCE,
+                 reset_idle: float = UPDATE_ID_RESET_IDLE):
+        self.size = size
+        self.reset_distance = reset_distance
+        self.reset_idle = reset_idle
+        self._bits = bytearray((size + 7) // 8)
+        self._high = -1
+        self._last_add = 0.0
+        self.duplicates = 0
+        self.stale = 0
+
+    def _in_window(self, update_id: int) -> bool:
+        return self._high >= 0 and self._high - self.size < update_id <= self._high
+
+    def _bit(self, update_id: int):
+        idx = update_id % self.size
+        return idx >> 3, 1 << (idx & 7)
+
+    def _reset(self, update_id: int):
+        self._bits[:] = bytes(len(self._bits))
+        self._high = update_id
+
+    def is_duplicate(self, update_id: int) -> bool:
+        """Return True if `update_id` was already recorded with `add()` (a retry)."""
+        if not self._in_window(update_id):
+            return False
+        byte, mask = self._bit(update_id)
+        if self._bits[byte] & mask:
+            self.duplicates += 1
+            return True
+        return False
+
+    def add(self, update_id: int, now: Optional[float] = None):
+        """Record `update_id`; call once the update has actually been queued."""
+        if now is None:
+            now = time.monotonic()
+        idle = self._high >= 0 and now - self._last_add >= self.reset_idle
+        self._last_add = now
+
+        if self._high < 0:
+            self._reset(update_id)
+        elif update_id > self._high:
+            if update_id - self._high >= self.size:
+                self._reset(update_id)
+            else:
+                # Slide forward, forgetting the ids that fall out of the window
+                for old in range(self._high + 1, update_id + 1):
+                    byte, mask = self._bit(old)
+                    self._bits[byte] &= ~mask & 0xFF
+                self._high = update_id
+        elif not self._in_window(update_id):
+            if idle or self._high - update_id >= self.reset_distance:
+                # Telegram restarted numbering from a lower random id
+                self._reset(update_id)
+            else:
+                # Late retry of an old update; keep dedupe for the recent ids
+                self.stale += 1
+                return
+        byte, mask = self._bit(update_id)
+        self._bits[byte] |= mask
@@ -0,0 +1,163 @@
+# log_pipeline.py
+import os
+import sys
+import copy
+import json
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+# Share of the queue only WARNING and above may use, so a flood of INFO can't crowd out errors
+LOG_QUEUE_RESERVE = float(os.getenv("LOG_QUEUE_RESERVE", 0.1))
+
+# Noisy message types: log template -> (records per minute, burst).
+# Anything beyond that is counted and reported on the next record that gets through.
+RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "Failed to delete scheduled message": (6, 3),
+    "Failed to handle webhook": (30, 10),
+    "Unhandled exception in handler": (30, 10),
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; runs on the writer thread, never on the event loop."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        elif record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per message type from RATE_LIMITS; other records always pass."""
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]] = RATE_LIMITS):
+        super().__init__()
+        self._limits = limits
+        # template -> [tokens, stamp, suppressed]
+        self._state: Dict[str, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        limit = self._limits.get(record.msg) if isinstance(record.msg, str) else None
+        if limit is None:
+            return True
+
+        per_minute, burst = limit
+        now = time.monotonic()
+        state = self._state.get(record.msg)
+        if state is None:
+            state = self._state[record.msg] = [burst, now, 0]
+        state[0] = min(burst, state[0] + (now - state[1]) * per_minute / 60.0)
+        state[1] = now
+
+        if state[0] < 1.0:
+            state[2] += 1
+            return False
+        state[0] -= 1.0
+        if state[2]:
+            record.suppressed = state[2]
+            state[2] = 0
+        return True
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks and leaves JSON encoding and I/O to the writer thread.
+
+    The message is rendered and any traceback turned into text here, so queued
+    records hold no live args or frames (Update objects, catalog slices, ...).
+    Filters run first, so rate-limited records never pay for a traceback.
+
+    The last `reserve` share of the queue is kept for WARNING and above: once the
+    queue fills past that mark INFO / DEBUG records are dropped, and only a queue
+    that is completely full loses warnings and errors. Drops are counted per level.
+    """
+
+    def __init__(self, log_queue: queue.Queue, reserve: float = LOG_QUEUE_RESERVE):
+        super().__init__(log_queue)
+        self.dropped: Dict[str, int] = {}
+        self._exc_formatter = logging.Formatter()
+        maxsize = log_queue.maxsize
+        self._low_limit = maxsize - max(1, int(maxsize * reserve)) if maxsize > 0 else None
+
+    def _drop(self, record: logging.LogRecord):
+        self.dropped[record.levelname] = self.dropped.get(record.levelname, 0) + 1
+
+    def emit(self, record: logging.LogRecord):
+        # Decide before prepare() so a dropped record never has its traceback rendered
+        if (record.levelno < logging.WARNING and self._low_limit is not None
+                and self.queue.qsize() >= self._low_limit):
+            self._drop(record)
+            return
+        super().emit(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self._drop(record)
+
+
+def setup_logging(level: str = LOG_LEVEL, stream=None,
+                  queue_size: int = LOG_QUEUE_SIZE) -> logging.handlers.QueueListener:
+    """Route the root logger through a bounded queue to a background JSON writer.
+
+    Returns the started listener; call `.stop()` on shutdown to flush it.
+    """
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(JsonFormatter())
+
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, writer, respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
+
+
+def _stop_listener(listener: logging.handlers.QueueListener):
+    # QueueListener.stop() isn't idempotent before 3.12; skip if already stopped
+    if listener._thread is not None:
+        listener.stop()
+
+
+def dropped_records() -> Optional[Dict[str, int]]:
+    """Records lost to a full queue per level name, or None if the pipeline isn't installed."""
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, DeferredQueueHandler):
+            return dict(handler.dropped)
+    return None
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from catalog import Catalog, FileRecord
+
+
+def make(n):
+    return Catalog.from_dict({f"Episode {i:05d}": f"id{i}" for i in range(n)})
+
+
+def test_legacy_and_metadata_round_trip():
+    data = {
+        "a": "x",
+        "b": {"file_id": "y", "file_size": 5, "duration": 60, "mime_type": "video/mp4"},
+        "ç": "z",
+    }
+    catalog = Catalog.from_dict(data)
+    assert catalog.to_dict() == data
+    assert catalog.get("b").mime_type == "video/mp4"
+    assert catalog.file_id("ç") == "z"
+
+
+def test_from_json_matches_json_loads():
+    data = {
+        "a": "x",
+        "b": {"file_id": "y", "file_unique_id": "u", "file_size": 5, "mime_type": "video/mp4"},
+        'ç "quoted"': "z",
+    }
+    for text in (json.dumps(data), json.dumps(data, indent=4, ensure_ascii=False)):
+        assert Catalog.from_json(text).to_dict() == json.loads(text)
+    # Later duplicates win, like json.loads()
+    assert Catalog.from_json('{"a": "x", "a": "y"}').to_dict() == {"a": "y"}
+    assert len(Catalog.from_json(" {} ")) == 0
+    assert len(Catalog.from_json("")) == 0
+
+
+@pytest.mark.parametrize("text", ['{"a" "x"}', '{"a": "x",}', '{"a": "x"} x', "[]", '{"a": "x"'])
+def test_from_json_rejects_malformed(text):
+    with pytest.raises(json.JSONDecodeError):
+        Catalog.from_json(text)
+
+
+def test_remove_and_replace():
+    catalog = make(100)
+    assert catalog.remove("Episode 00003")
+    assert not catalog.remove("Episode 00003")
+    assert "Episode 00003" not in catalog
+    assert len(catalog) == 99
+
+    catalog.add(FileRecord("Episode 00005", "new"))
+    assert catalog.file_id("Episode 00005") == "new"
+    assert len(catalog) == 99
+    # Replaced entries move to the end
+    assert catalog.names()[-1] == "Episode 00005"
+
+    catalog.add(FileRecord("Episode 00003", "back"))
+    assert catalog.file_id("Episode 00003") == "back"
+
+
+def test_compaction_keeps_live_entries():
+    catalog = make(6000)
+    for i in range(0, 6000, 2):
+        assert catalog.remove(f"Episode {i:05d}")
+    assert len(catalog) == 3000
+    assert catalog._dead_count < 3000  # compacted at least once
+    assert catalog.names() == [f"Episode {i:05d}" for i in range(1, 6000, 2)]
+    assert all(catalog.file_id(f"Episode {i:05d}") == f"id{i}" for i in range(1, 6000, 2))
+    assert "Episode 00000" not in catalog
+
+
+def test_match_is_case_insensitive():
+    catalog = make(20)
+    assert [r.name for r in catalog.match("episode 0001")] == [f"Episode {i:05d}" for i in range(10, 20)]
@@ -0,0 +1,76 @@
+import delivery
+from delivery import DeliveryLedger
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make(monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(delivery.time, "monotonic", clock)
+    return DeliveryLedger(**kwargs), clock
+
+
+def test_in_flight_duplicate_is_rejected(monkeypatch):
+    ledger, _ = make(monkeypatch)
+    assert ledger.begin(1, "a", 5) == 0
+    assert ledger.begin(1, "a", 5) is None
+    # Other chats / aliases are independent
+    assert ledger.begin(2, "a", 5) == 0
+    assert ledger.begin(1, "b", 5) == 0
+
+
+def test_resume_after_release(monkeypatch):
+    ledger, _ = make(monkeypatch)
+    ledger.begin(1, "a", 5)
+    ledger.advance(1, "a")
+    ledger.advance(1, "a")
+    ledger.release(1, "a")
+    assert ledger.begin(1, "a", 5) == 2
+
+
+def test_finish_starts_over(monkeypatch):
+    ledger, _ = make(monkeypatch)
+    ledger.begin(1, "a", 5)
+    ledger.advance(1, "a")
+    ledger.finish(1, "a")
+    ledger.release(1, "a")
+    assert ledger.begin(1, "a", 5) == 0
+
+
+def test_total_change_resets(monkeypatch):
+    ledger, _ = make(monkeypatch)
+    ledger.begin(1, "a", 5)
+    ledger.advance(1, "a")
+    ledger.release(1, "a")
+    # The alias now expands to a different file list
+    assert ledger.begin(1, "a", 6) == 0
+
+
+def test_ttl_expiry(monkeypatch):
+    ledger, clock = make(monkeypatch, ttl=100)
+    ledger.begin(1, "a", 5)
+    ledger.advance(1, "a")
+    ledger.release(1, "a")
+    clock.now = 50
+    assert ledger.begin(1, "a", 5) == 1
+    ledger.release(1, "a")
+    clock.now = 200
+    assert ledger.begin(1, "a", 5) == 0
+
+
+def test_max_entries_eviction(monkeypatch):
+    ledger, _ = make(monkeypatch, max_entries=2)
+    for chat_id in (1, 2, 3):
+        ledger.begin(chat_id, "a", 5)
+        ledger.advance(chat_id, "a")
+        ledger.release(chat_id, "a")
+    # Chat 1 was the oldest entry and got evicted, so it starts over
+    assert ledger.begin(3, "a", 5) == 1
+    assert ledger.begin(2, "a", 5) == 1
+    assert ledger.begin(1, "a", 5) == 0
@@ -0,0 +1,138 @@
+from ingress import ALLOWED, COLLAPSED, DROPPED, IngressLimiter, UpdateIdWindow
+
+
+def record(window, update_id):
+    """Mimic handle_webhook: check, then add once queued."""
+    if window.is_duplicate(update_id):
+        return True
+    window.add(update_id)
+    return False
+
+
+def test_retry_is_duplicate():
+    window = UpdateIdWindow(64)
+    assert record(window, 100) is False
+    assert record(window, 101) is False
+    assert record(window, 100) is True
+    assert record(window, 101) is True
+    assert window.duplicates == 2
+
+
+def test_unqueued_id_is_not_duplicate():
+    window = UpdateIdWindow(64)
+    # Checked but never added (queueing failed): the retry must get through
+    assert window.is_duplicate(100) is False
+    assert record(window, 100) is False
+
+
+def test_out_of_order_within_window():
+    window = UpdateIdWindow(64)
+    record(window, 100)
+    record(window, 103)
+    assert record(window, 102) is False
+    assert record(window, 102) is True
+
+
+def test_reset_to_lower_random_id():
+    window = UpdateIdWindow(64, reset_distance=100000)
+    record(window, 500000)
+    assert record(window, 12345) is False
+    assert record(window, 12346) is False
+    assert record(window, 12347) is False
+    assert record(window, 12346) is True
+    assert window.duplicates == 1
+
+
+def test_jump_ahead_past_window():
+    window = UpdateIdWindow(64)
+    record(window, 100)
+    assert record(window, 100000) is False
+    assert record(window, 100) is False
+
+
+def test_wraparound_clears_reused_bits():
+    window = UpdateIdWindow(16)
+    for update_id in range(10, 20):
+        assert record(window, update_id) is False
+    # 26..29 share bitmap slots with 10..13; sliding forward must clear them
+    for update_id in range(20, 30):
+        assert record(window, update_id) is False
+    for update_id in range(20, 30):
+        assert record(window, update_id) is True
+    # 13 is now out of the window: processed, but only counted as stale
+    assert record(window, 13) is False
+    assert window.stale == 1
+    assert record(window, 29) is True
+
+
+def test_late_retry_does_not_wipe_window():
+    window = UpdateIdWindow(64, reset_distance=100000)
+    for update_id in range(1000, 1100):
+        record(window, update_id)
+    window.add(900)
+    assert window.stale == 1
+    assert window.is_duplicate(1099) is True
+    assert record(window, 1100) is False
+
+
+def test_reset_after_long_idle():
+    window = UpdateIdWindow(64, reset_distance=100000, reset_idle=3600)
+    window.add(1000, now=0)
+    window.add(900, now=10)
+    assert window.stale == 1
+    # A lower id after a long quiet period is a restart, not a retry
+    window.add(500, now=10000)
+    assert window.is_duplicate(500) is True
+    assert window.is_duplicate(1000) is False
+
+
+def test_burst_then_refill():
+    limiter = IngressLimiter(rate_per_minute=6, burst=3, collapse_seconds=10)
+    assert [limiter.check(1, now=0) for _ in range(4)] == [ALLOWED, ALLOWED, ALLOWED, DROPPED]
+    # 6/min refills one token every 10 s
+    assert limiter.check(1, now=5) == DROPPED
+    assert limiter.check(1, now=15) == ALLOWED
+    assert limiter.check(1, now=15) == DROPPED
+    assert limiter.counters["allowed"] == 4
+    assert limiter.counters["dropped"] == 3
+
+
+def test_repeat_is_collapsed_within_window():
+    limiter = IngressLimiter(rate_per_minute=60, burst=5, collapse_seconds=10)
+    assert limiter.check(1, "hi", now=0) == ALLOWED
+    assert limiter.check(1, "hi", now=5) == COLLAPSED
+    assert limiter.check(1, "other", now=5) == ALLOWED
+    assert limiter.check(1, "other", now=16) == ALLOWED
+    assert limiter.counters["collapsed"] == 1
+
+
+def test_callback_window_override():
+    limiter = IngressLimiter(rate_per_minute=60, burst=5, collapse_seconds=10)
+    assert limiter.check(1, "refresh:a", now=1, collapse_seconds=2) == ALLOWED
+    assert limiter.check(1, "refresh:a", now=2, collapse_seconds=2) == COLLAPSED
+    # Pressing Refresh again after joining the channel must go through
+    assert limiter.check(1, "refresh:a", now=8, collapse_seconds=2) == ALLOWED
+
+
+def test_dropped_request_does_not_arm_collapse():
+    limiter = IngressLimiter(rate_per_minute=6, burst=1, collapse_seconds=10)
+    assert limiter.check(1, "a", now=0) == ALLOWED
+    assert limiter.check(1, "b", now=1) == DROPPED
+    # Token refilled at 10 s: the retry of "b" is allowed, not collapsed
+    assert limiter.check(1, "b", now=11) == ALLOWED
+    assert limiter.counters["collapsed"] == 0
+
+
+def test_lru_eviction_bounds_table():
+    limiter = IngressLimiter(rate_per_minute=6, burst=1, max_users=3)
+    for user_id in (1, 2, 3):
+        limiter.check(user_id, now=0)
+    # Touch 1 so 2 is the least recently used
+    assert limiter.check(1, now=0) == DROPPED
+    limiter.check(4, now=0)
+    stats = limiter.snapshot()
+    assert stats["tracked_users"] == 3
+    assert stats["evicted"] == 1
+    # 1 survived with an empty bucket; 2 was evicted and starts with a full one
+    assert limiter.check(1, now=0) == DROPPED
+    assert limiter.check(2, now=0) == ALLOWED
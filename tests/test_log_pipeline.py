@@ -0,0 +1,51 @@
+import logging
+import queue
+
+from log_pipeline import DeferredQueueHandler
+
+
+def make(maxsize, reserve=0.1):
+    logger = logging.getLogger(f"test_log_pipeline.{maxsize}.{reserve}")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    log_queue = queue.Queue(maxsize=maxsize)
+    handler = DeferredQueueHandler(log_queue, reserve=reserve)
+    logger.handlers[:] = [handler]
+    return logger, handler, log_queue
+
+
+def drain(log_queue):
+    records = []
+    while not log_queue.empty():
+        records.append(log_queue.get_nowait())
+    return records
+
+
+def test_info_cannot_use_the_reserve():
+    logger, handler, log_queue = make(10, reserve=0.2)
+    for i in range(20):
+        logger.info("info %d", i)
+    assert log_queue.qsize() == 8
+    assert handler.dropped == {"INFO": 12}
+
+    logger.warning("warning")
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        logger.exception("error")
+    logger.error("lost")
+    assert handler.dropped == {"INFO": 12, "ERROR": 1}
+
+    records = drain(log_queue)
+    assert [r.levelname for r in records[-2:]] == ["WARNING", "ERROR"]
+    assert "RuntimeError: boom" in records[-1].exc_text
+    assert records[0].getMessage() == "info 0" and records[0].args is None
+
+
+def test_reserve_is_at_least_one_slot():
+    logger, handler, log_queue = make(3, reserve=0.0)
+    for i in range(5):
+        logger.debug("debug %d", i)
+    logger.error("error")
+    assert [r.levelname for r in drain(log_queue)] == ["DEBUG", "DEBUG", "ERROR"]
+    assert handler.dropped == {"DEBUG": 3}